@@ -4,6 +4,10 @@ import time
 import json
 import requests
 import smtplib
+import threading
+from collections import Counter
+import pyarrow as pa
+import pyarrow.compute as pc
 from dotenv import load_dotenv
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
@@ -11,6 +15,8 @@ from google.oauth2 import service_account
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+import results_store
+
 # ---------------------------
 # Load environment variables
 # ---------------------------
@@ -29,9 +35,16 @@ SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
 ]
 
-# Put your spreadsheet ID here (you already shared this one earlier)
-SPREADSHEET_ID = "your_spreadsheet_id"
-SHEET_NAME = "sheet_name"
+# Default pipeline (single folder -> single sheet). Override via .env;
+# for several openings at once see scheduler.py and pipelines.json.
+SPREADSHEET_ID = os.getenv("SPREADSHEET_ID", "your_spreadsheet_id")
+SHEET_NAME = os.getenv("SHEET_NAME", "sheet_name")
+FOLDER_ID = os.getenv("FOLDER_ID", "your_folder_id")
+NOTIFY_EMAIL = os.getenv("NOTIFY_EMAIL", "your_mail")
+
+# Results live in the local store (results_store.py); the sheet is re-synced
+# from it in the background every N seconds
+MIRROR_INTERVAL = int(os.getenv("SHEETS_MIRROR_INTERVAL", "30"))
 
 # Desired headers in the sheet (final order)
 HEADERS = [
@@ -66,16 +79,16 @@ def get_sheets_service():
 # ---------------------------
 # Ensure headers exist in Sheet
 # ---------------------------
-def ensure_headers():
+def ensure_headers(spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME):
     sheets = get_sheets_service().spreadsheets()
-    header_range = f"{SHEET_NAME}!A1:J1"
+    header_range = f"{sheet_name}!A1:J1"
     try:
-        result = sheets.values().get(spreadsheetId=SPREADSHEET_ID, range=header_range).execute()
+        result = sheets.values().get(spreadsheetId=spreadsheet_id, range=header_range).execute()
         values = result.get("values", [])
         if not values or len(values[0]) < len(HEADERS):
             # Write headers
             sheets.values().update(
-                spreadsheetId=SPREADSHEET_ID,
+                spreadsheetId=spreadsheet_id,
                 range=header_range,
                 valueInputOption="RAW",
                 body={"values": [HEADERS]},
@@ -90,47 +103,65 @@ def ensure_headers():
 # ---------------------------
 # Get list of filenames already present (to skip duplicates)
 # ---------------------------
-def get_existing_filenames():
+def get_sheet_filenames(spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME):
+    # Column A as a list: the same filename can appear once per Drive file
     sheets = get_sheets_service().spreadsheets()
+    result = sheets.values().get(spreadsheetId=spreadsheet_id, range=f"{sheet_name}!A2:A").execute()
+    values = result.get("values", [])
+    return [row[0] for row in values if len(row) > 0]
+
+def get_existing_filenames(spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME, strict=False):
     try:
-        result = sheets.values().get(spreadsheetId=SPREADSHEET_ID, range=f"{SHEET_NAME}!A2:A").execute()
-        values = result.get("values", [])
-        existing = [row[0] for row in values if len(row) > 0]
-        return set(existing)
+        return set(get_sheet_filenames(spreadsheet_id, sheet_name))
     except Exception as e:
+        if strict:
+            raise
         print("⚠️ Could not fetch existing filenames, will assume none exist. Error:", e)
         return set()
 
 # ---------------------------
-# Append a row to the sheet
+# Append rows to the sheet
 # ---------------------------
-def append_row_to_sheet(row):
+def append_rows_to_sheet(rows, spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME):
+    # One API call for the whole batch (mirror syncs can carry many rows)
     sheets = get_sheets_service().spreadsheets()
     try:
         sheets.values().append(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f"{SHEET_NAME}!A:J",
+            spreadsheetId=spreadsheet_id,
+            range=f"{sheet_name}!A:J",
             valueInputOption="RAW",
-            body={"values": [row]},
+            body={"values": rows},
         ).execute()
-        print(f"📄 Added '{row[0]}' to Google Sheet.")
+        print(f"📄 Added {len(rows)} rows to Google Sheet '{sheet_name}'.")
     except Exception as e:
-        print("❌ Failed to append row to Google Sheet:", e)
+        print("❌ Failed to append rows to Google Sheet:", e)
         raise
 
 # ---------------------------
 # Sort sheet by ATS Score (descending)
 # ---------------------------
-def sort_sheet_by_ats():
+def get_sheet_id(spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME):
+    sheets = get_sheets_service()
+    meta = sheets.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
+    tabs = meta["sheets"]
+    # Several pipelines may share one spreadsheet, so match the tab by title,
+    # and never fall back to another tab: that could belong to another pipeline
+    for t in tabs:
+        if t["properties"].get("title") == sheet_name:
+            return t["properties"]["sheetId"]
+    raise ValueError(f"No tab named '{sheet_name}' in spreadsheet {spreadsheet_id}")
+
+def sort_sheet_by_ats(spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME):
     sheets = get_sheets_service()
     # ATS Score is column J (index 9). We will use the batchUpdate sort request.
     try:
+        sheet_id = get_sheet_id(spreadsheet_id, sheet_name)
         body = {
             "requests": [
                 {
                     "sortRange": {
                         "range": {
-                            "sheetId": 0,            # Usually Sheet1 has ID 0; if not, you can fetch actual sheetId
+                            "sheetId": sheet_id,
                             "startRowIndex": 1,     # skip header row
                         },
                         "sortSpecs": [
@@ -143,18 +174,10 @@ def sort_sheet_by_ats():
                 }
             ]
         }
-        sheets.spreadsheets().batchUpdate(spreadsheetId=SPREADSHEET_ID, body=body).execute()
-        print("🔽 Sheet sorted by ATS Score (descending).")
+        sheets.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body).execute()
+        print(f"🔽 Sheet '{sheet_name}' sorted by ATS Score (descending).")
     except Exception as e:
-        # If sheetId 0 is wrong for your sheet, fetch actual sheetId then retry:
-        try:
-            meta = sheets.get(spreadsheetId=SPREADSHEET_ID).execute()
-            sheet_id = meta["sheets"][0]["properties"]["sheetId"]
-            body["requests"][0]["sortRange"]["range"]["sheetId"] = sheet_id
-            sheets.spreadsheets().batchUpdate(spreadsheetId=SPREADSHEET_ID, body=body).execute()
-            print("🔽 Sheet sorted by ATS Score (descending) using fetched sheetId.")
-        except Exception as e2:
-            print("❌ Failed to sort sheet:", e2)
+        print("❌ Failed to sort sheet:", e)
 
 # ---------------------------
 # Upload file to Gemini (returns file_uri)
@@ -176,10 +199,9 @@ def upload_file_to_gemini(file_name, file_bytes):
 # ---------------------------
 # Ask Gemini to analyze; Strong prompt to force JSON
 # ---------------------------
-def analyze_with_gemini(file_uri, max_retries=3, backoff=3):
-    prompt = """
-You are a strict JSON-only responder. Analyze the resume PDF given by the file URI provided in the file_data part.
-Return ONLY valid JSON (no explanatory text) with EXACT keys:
+# Field spec shared by every mode. In cached/batch modes it is sent once as the
+# system instruction (and cached server-side when GEMINI_CONTEXT_CACHE is on).
+RESUME_FIELDS_SPEC = """
 "name", "domain", "email", "skills", "education", "projects", "summary", "experience", "ats_score"
 
 Requirements:
@@ -192,28 +214,144 @@ Requirements:
 - "summary": short textual summary string
 - "experience": string describing years/roles
 - "ats_score": integer between 0 and 100
+"""
 
+# Original one-resume-per-call prompt (GEMINI_BATCH_SIZE=1, no context cache)
+ANALYSIS_PROMPT = f"""
+You are a strict JSON-only responder. Analyze the resume PDF given by the file URI provided in the file_data part.
+Return ONLY valid JSON (no explanatory text) with EXACT keys:{RESUME_FIELDS_SPEC}
 Do not include any other keys. If you cannot determine a field, set it to "N/A" or an empty array for lists.
 Output must be parseable by a JSON parser.
 """
 
-    payload = {
-        "contents": [
-            {"parts": [{"file_data": {"mime_type": "application/pdf", "file_uri": file_uri}}]},
-            {"parts": [{"text": prompt}]}
-        ]
+SYSTEM_PROMPT = f"""
+You are a strict JSON-only responder that analyzes resume PDFs.
+Each resume result is a JSON object with EXACT keys:{RESUME_FIELDS_SPEC}
+If you cannot determine a field, set it to "N/A" or an empty array for lists.
+Output must be parseable by a JSON parser.
+"""
+SINGLE_INSTRUCTION = "Analyze the resume PDF in the file_data part. Return ONLY that one JSON object (no explanatory text, no other keys)."
+BATCH_INSTRUCTION = (
+    "Analyze every resume PDF above; each file_data part is preceded by a text part with its label. "
+    "Return ONLY a JSON array (no explanatory text) with one object per resume. "
+    'Each object has the keys above plus "file", set to that resume\'s label. Do not include any other keys.'
+)
+
+# Reuse the static instruction via Gemini context caching
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "0") == "1"
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "3600"))
+GEMINI_CACHE_URL = f"https://generativelanguage.googleapis.com/v1beta/cachedContents?key={GEMINI_API_KEY}"
+# Resumes packed into one generateContent request (1 = one call per resume)
+GEMINI_BATCH_SIZE = int(os.getenv("GEMINI_BATCH_SIZE", "1"))
+
+_prompt_cache = {"name": None, "expires_at": 0.0, "retry_at": 0.0}
+
+# Optional callable run before every generateContent request; the scheduler
+# installs its shared GEMINI_RPM pacer here so retries and fallbacks count too
+_gemini_pacer = None
+
+def set_gemini_pacer(pacer):
+    global _gemini_pacer
+    _gemini_pacer = pacer
+
+# Token / request accounting from usageMetadata (see bench_gemini.py)
+# "requests" counts every generateContent attempt (503s and errors included),
+# "cache_requests" every cachedContents create call
+GEMINI_USAGE = {"requests": 0, "cache_requests": 0, "resumes": 0, "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+
+def reset_gemini_usage():
+    for k in GEMINI_USAGE:
+        GEMINI_USAGE[k] = 0
+
+def delete_cached_prompt(name):
+    # Best effort: an orphaned cache only costs storage until its TTL runs out
+    try:
+        requests.delete(f"https://generativelanguage.googleapis.com/v1beta/{name}?key={GEMINI_API_KEY}", timeout=30)
+    except Exception as e:
+        print("⚠️ Could not delete Gemini cache", name, e)
+
+def get_cached_prompt():
+    now = time.time()
+    if _prompt_cache["name"] and now < _prompt_cache["expires_at"]:
+        return _prompt_cache["name"]
+    if now < _prompt_cache["retry_at"]:
+        return None
+    if _prompt_cache["name"]:
+        # About to expire: replace it instead of leaving two caches alive
+        delete_cached_prompt(_prompt_cache["name"])
+        _prompt_cache["name"] = None
+
+    body = {
+        "model": f"models/{GEMINI_MODEL}",
+        "systemInstruction": {"parts": [{"text": SYSTEM_PROMPT}]},
+        "ttl": f"{GEMINI_CACHE_TTL}s",
     }
+    try:
+        GEMINI_USAGE["cache_requests"] += 1
+        resp = requests.post(GEMINI_CACHE_URL, headers={"Content-Type": "application/json"}, json=body, timeout=60)
+        resp.raise_for_status()
+        _prompt_cache["name"] = resp.json()["name"]
+        # Refresh a minute early so an in-flight request never hits an expired cache
+        _prompt_cache["expires_at"] = now + GEMINI_CACHE_TTL - 60
+        print("🗃️ Gemini prompt cached as", _prompt_cache["name"])
+        return _prompt_cache["name"]
+    except Exception as e:
+        # e.g. prompt below the model's minimum cacheable size: send it inline instead,
+        # and don't ask again until the TTL would have passed
+        print("⚠️ Gemini context cache unavailable, sending prompt inline:", e)
+        _prompt_cache["name"] = None
+        _prompt_cache["retry_at"] = now + GEMINI_CACHE_TTL
+        return None
+
+def invalidate_cached_prompt(retry_after=60):
+    if _prompt_cache["name"]:
+        delete_cached_prompt(_prompt_cache["name"])
+    _prompt_cache["name"] = None
+    _prompt_cache["expires_at"] = 0.0
+    # Send inline for a minute rather than recreating a cache on every request
+    _prompt_cache["retry_at"] = time.time() + retry_after
+
+def build_gemini_payload(parts, instruction, use_cache=None):
+    # use_cache=None -> GEMINI_CONTEXT_CACHE, read at call time
+    if use_cache is None:
+        use_cache = GEMINI_CONTEXT_CACHE
+    payload = {"contents": [{"role": "user", "parts": parts + [{"text": instruction}]}]}
+    cache_name = get_cached_prompt() if use_cache else None
+    if cache_name:
+        payload["cachedContent"] = cache_name
+    else:
+        payload["systemInstruction"] = {"parts": [{"text": SYSTEM_PROMPT}]}
+    return payload
 
+def generate_with_gemini(payload, resumes=1, max_retries=3, backoff=3):
     for attempt in range(1, max_retries + 1):
+        if _gemini_pacer:
+            _gemini_pacer()
+        GEMINI_USAGE["requests"] += 1
         try:
-            resp = requests.post(GEMINI_ANALYZE_URL, headers={"Content-Type": "application/json"}, json=payload, timeout=60)
+            resp = requests.post(GEMINI_ANALYZE_URL, headers={"Content-Type": "application/json"}, json=payload, timeout=60 * resumes)
             # If service overloaded, allow retry with backoff
             if resp.status_code == 503:
                 print(f"⚠️ Gemini overloaded (503). Retry {attempt}/{max_retries} after backoff.")
                 time.sleep(backoff * attempt)
                 continue
+            # Only errors about the cache itself: a plain 400 (bad file_uri, oversized
+            # batch) must not throw away a healthy cache
+            cache_error = resp.status_code in (403, 404) or (resp.status_code == 400 and "cachedContent" in resp.text)
+            if "cachedContent" in payload and cache_error:
+                # Cache expired or was deleted server-side: drop it; caller resends inline
+                print("⚠️ Gemini rejected cached prompt, dropping cache:", resp.text[:200])
+                invalidate_cached_prompt()
+                return None
             resp.raise_for_status()
             data = resp.json()
+
+            usage = data.get("usageMetadata", {})
+            GEMINI_USAGE["resumes"] += resumes
+            GEMINI_USAGE["prompt_tokens"] += usage.get("promptTokenCount", 0)
+            GEMINI_USAGE["cached_tokens"] += usage.get("cachedContentTokenCount", 0)
+            GEMINI_USAGE["output_tokens"] += usage.get("candidatesTokenCount", 0)
+
             # Expect candidates -> content -> parts -> text
             if "candidates" in data and len(data["candidates"]) > 0:
                 part = data["candidates"][0]["content"]["parts"][0]
@@ -227,10 +365,46 @@ Output must be parseable by a JSON parser.
             time.sleep(backoff * attempt)
     return None
 
+def analyze_with_gemini(file_uri, max_retries=3, backoff=3, use_cache=None):
+    file_part = {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri}}
+    if use_cache is None:
+        use_cache = GEMINI_CONTEXT_CACHE
+    if not use_cache:
+        payload = {
+            "contents": [
+                {"parts": [file_part]},
+                {"parts": [{"text": ANALYSIS_PROMPT}]}
+            ]
+        }
+        return generate_with_gemini(payload, 1, max_retries, backoff)
+
+    payload = build_gemini_payload([file_part], SINGLE_INSTRUCTION, use_cache)
+    text = generate_with_gemini(payload, 1, max_retries, backoff)
+    if text is None and "cachedContent" in payload:
+        text = generate_with_gemini(build_gemini_payload([file_part], SINGLE_INSTRUCTION, use_cache=False), 1, max_retries, backoff)
+    return text
+
+def analyze_batch_with_gemini(labelled_uris, max_retries=3, backoff=3, use_cache=None):
+    # labelled_uris: [(label, file_uri), ...] -> one request, keyed JSON array back
+    parts = []
+    for label, file_uri in labelled_uris:
+        parts.append({"text": f"Resume label: {label}"})
+        parts.append({"file_data": {"mime_type": "application/pdf", "file_uri": file_uri}})
+
+    payload = build_gemini_payload(parts, BATCH_INSTRUCTION, use_cache)
+    text = generate_with_gemini(payload, len(labelled_uris), max_retries, backoff)
+    if text is None and "cachedContent" in payload:
+        text = generate_with_gemini(build_gemini_payload(parts, BATCH_INSTRUCTION, use_cache=False), len(labelled_uris), max_retries, backoff)
+    return text
+
 # ---------------------------
 # Parse Gemini JSON (with robust fallback)
 # ---------------------------
-def parse_gemini_output(text):
+def parse_gemini_output(text, keys=None):
+    # keys given -> batched reply: split the JSON array into {key: result or None}
+    if keys is not None:
+        return parse_gemini_batch_output(text, keys)
+
     if not text:
         return None
 
@@ -251,40 +425,39 @@ def parse_gemini_output(text):
     # Fallback: return minimal map with summary only
     return {"name": "N/A", "domain": "N/A", "email": "N/A", "skills": [], "education": "N/A", "projects": [], "summary": text, "experience": "N/A", "ats_score": "N/A"}
 
-# ---------------------------
-# Analyze one resume file id -> dictionary result
-# ---------------------------
-def analyze_resume_file(file_id, file_name):
-    drive = get_drive_service()
-    request = drive.files().get_media(fileId=file_id)
-    file_buffer = io.BytesIO()
-    downloader = MediaIoBaseDownload(file_buffer, request)
-
-    done = False
-    while not done:
-        status, done = downloader.next_chunk()
-
-    file_buffer.seek(0)
-    file_bytes = file_buffer.read()
-
-    # Upload to Gemini
-    file_uri = upload_file_to_gemini(file_name, file_bytes)
-    if not file_uri:
-        print("❌ Upload to Gemini failed for", file_name)
-        return None
-
-    print("📤 Uploaded to Gemini successfully.")
-    gemini_text = analyze_with_gemini(file_uri)
-    if not gemini_text:
-        print("⚠️ No analysis returned by Gemini.")
-        return None
+def parse_gemini_batch_output(text, keys):
+    results = {k: None for k in keys}
+    if not text:
+        return results
 
-    parsed = parse_gemini_output(gemini_text)
-    if not parsed:
-        print("⚠️ Could not parse Gemini output at all.")
-        return None
+    items = None
+    try:
+        items = json.loads(text)
+    except Exception:
+        start = text.find("[")
+        end = text.rfind("]")
+        if start != -1 and end != -1 and end > start:
+            try:
+                items = json.loads(text[start:end+1])
+            except Exception:
+                pass
+    if isinstance(items, dict):
+        # Tolerate {"results": [...]} or a single object for a one-resume batch
+        items = items.get("results", [items])
+    if not isinstance(items, list):
+        # Unparseable: leave every key None so callers fall back to single calls
+        return results
+
+    for item in items:
+        if isinstance(item, dict) and item.get("file") in results:
+            item = dict(item)
+            results[item.pop("file")] = item
+    return results
 
-    # Normalize fields and types
+# ---------------------------
+# Normalize fields and types of a parsed result
+# ---------------------------
+def normalize_parsed(parsed):
     # Ensure keys exist
     normalized = {}
     normalized["name"] = parsed.get("name", "N/A")
@@ -316,6 +489,84 @@ def analyze_resume_file(file_id, file_name):
 
     return normalized
 
+# ---------------------------
+# Download a Drive file + upload it to Gemini (returns file_uri)
+# ---------------------------
+def download_and_upload(file_id, file_name):
+    # Errors stay per file (None), so one bad Drive file can't sink a whole batch
+    try:
+        drive = get_drive_service()
+        request = drive.files().get_media(fileId=file_id)
+        file_buffer = io.BytesIO()
+        downloader = MediaIoBaseDownload(file_buffer, request)
+
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+
+        file_buffer.seek(0)
+        file_bytes = file_buffer.read()
+    except Exception as e:
+        print(f"❌ Drive download failed for {file_name}:", e)
+        return None
+
+    # Upload to Gemini
+    file_uri = upload_file_to_gemini(file_name, file_bytes)
+    if not file_uri:
+        print("❌ Upload to Gemini failed for", file_name)
+        return None
+
+    print("📤 Uploaded to Gemini successfully.")
+    return file_uri
+
+# ---------------------------
+# Analyze one resume file id -> dictionary result
+# ---------------------------
+def analyze_resume_file(file_id, file_name, file_uri=None):
+    file_uri = file_uri or download_and_upload(file_id, file_name)
+    if not file_uri:
+        return None
+
+    gemini_text = analyze_with_gemini(file_uri)
+    if not gemini_text:
+        print("⚠️ No analysis returned by Gemini.")
+        return None
+
+    parsed = parse_gemini_output(gemini_text)
+    if not parsed:
+        print("⚠️ Could not parse Gemini output at all.")
+        return None
+
+    return normalize_parsed(parsed)
+
+# ---------------------------
+# Analyze several resumes in one Gemini request
+#   -> ({file_id: result or None}, {file_id: file_uri} missing from the reply)
+# ---------------------------
+def analyze_resume_files(files):
+    # Keyed by Drive file id throughout: names can repeat within one folder
+    if len(files) == 1:
+        f = files[0]
+        return {f["id"]: analyze_resume_file(f["id"], f["name"], file_uri=f.get("file_uri"))}, {}
+
+    # A file_uri from an earlier upload (a requeued resume, bench_gemini.py) is reused
+    uris = {f["id"]: f.get("file_uri") or download_and_upload(f["id"], f["name"]) for f in files}
+    # Short positional labels: file names can repeat or contain quotes
+    labels = {f"resume_{i}": f for i, f in enumerate(files, 1) if uris[f["id"]]}
+
+    results = {f["id"]: None for f in files}
+    missing = {}
+    if labels:
+        gemini_text = analyze_batch_with_gemini([(label, uris[f["id"]]) for label, f in labels.items()])
+        parsed = parse_gemini_output(gemini_text, keys=list(labels))
+        for label, f in labels.items():
+            if parsed[label]:
+                results[f["id"]] = normalize_parsed(parsed[label])
+            else:
+                # Caller decides when to retry it alone; the upload can be reused
+                missing[f["id"]] = uris[f["id"]]
+    return results, missing
+
 # ---------------------------
 # Build row in correct order for sheet
 # ---------------------------
@@ -350,6 +601,69 @@ def build_row(file_name, parsed):
     ]
     return row
 
+# ---------------------------
+# Mirror local results store -> Sheet (diff by filename)
+# ---------------------------
+def sync_store_to_sheet(store, spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME):
+    # Persist first, so the sheet never shows a row the store could lose
+    results_store.flush(store)
+    in_sheet = Counter(get_sheet_filenames(spreadsheet_id, sheet_name))
+
+    # Diff by count per filename: the sheet has no Drive id column, and two Drive
+    # files may share a name, so each store record needs its own row
+    table = results_store.read_table(store)
+    counts = pc.value_counts(table["filename"]).to_pylist()
+    short = {c["values"]: c["counts"] - in_sheet[c["values"]] for c in counts if c["counts"] > in_sheet[c["values"]]}
+    if not short:
+        return 0
+    table = table.filter(pc.is_in(table["filename"], value_set=pa.array(list(short), type=pa.string())))
+
+    # For each short filename, mirror its most recently analyzed records
+    by_name = {}
+    for r in sorted(table.to_pylist(), key=lambda r: r["analyzed_at"], reverse=True):
+        by_name.setdefault(r["filename"], []).append(r)
+    missing = [r for name, recs in by_name.items() for r in recs[:short[name]]]
+
+    rows = [build_row(r["filename"], results_store.to_result(r)) for r in missing]
+    append_rows_to_sheet(rows, spreadsheet_id, sheet_name)
+    sort_sheet_by_ats(spreadsheet_id, sheet_name)
+    return len(rows)
+
+def start_sheet_mirror(store, spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME, interval=MIRROR_INTERVAL):
+    wake, stop = threading.Event(), threading.Event()
+
+    def loop():
+        while True:
+            wake.wait(interval)
+            wake.clear()
+            # Shutdown sync happens in stop_sheet_mirror, after this thread has exited
+            if stop.is_set():
+                return
+            try:
+                sync_store_to_sheet(store, spreadsheet_id, sheet_name)
+            except Exception as e:
+                # Store keeps the data; the next sync retries the diff
+                print(f"⚠️ Sheet mirror sync failed for '{sheet_name}':", e)
+
+    thread = threading.Thread(target=loop, name=f"sheet-mirror-{sheet_name}", daemon=True)
+    thread.start()
+    store["mirror"] = {"thread": thread, "wake": wake, "stop": stop, "spreadsheet_id": spreadsheet_id, "sheet_name": sheet_name}
+
+def stop_sheet_mirror(store):
+    # Wait for any in-flight sync, then flush and sync once more from this thread,
+    # so records appended while that sync was running still reach Parquet and the sheet
+    mirror = store.pop("mirror", None)
+    if mirror:
+        mirror["stop"].set()
+        mirror["wake"].set()
+        mirror["thread"].join()
+    results_store.flush(store)
+    if mirror:
+        try:
+            sync_store_to_sheet(store, mirror["spreadsheet_id"], mirror["sheet_name"])
+        except Exception as e:
+            print(f"⚠️ Final sheet sync failed for '{mirror['sheet_name']}' (results are saved locally):", e)
+
 # ---------------------------
 # Send Email
 # ---------------------------
@@ -372,44 +686,69 @@ def send_email(to_email, subject, body):
 # ---------------------------
 # Main process
 # ---------------------------
-def process_resumes_from_drive():
-    # ensure headers
-    ensure_headers()
-
-    # 👇 Your specific Google Drive folder ID
-    FOLDER_ID = "your_folder_id"
-
-    # get Drive files only from that folder
+def list_folder_pdfs(folder_id=FOLDER_ID):
+    # get Drive files only from that folder (paged: big openings exceed one page)
     drive = get_drive_service()
-    results = drive.files().list(
-        q=f"'{FOLDER_ID}' in parents and mimeType='application/pdf'",
-        fields="files(id, name)"
-    ).execute()
-    files = results.get("files", [])
-
-    if not files:
-        print("⚠️ No PDF resumes found in Google Drive folder.")
-        return
-
-    existing = get_existing_filenames()
-    print(f"📋 {len(existing)} resumes already in sheet. Skipping duplicates.")
+    files, page_token = [], None
+    while True:
+        results = drive.files().list(
+            q=f"'{folder_id}' in parents and mimeType='application/pdf'",
+            fields="nextPageToken, files(id, name)",
+            pageToken=page_token,
+        ).execute()
+        files.extend(results.get("files", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return files
+
+def get_pending_files(files, store, spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME):
+    # Store results are matched by Drive file id, so same-named files stay distinct.
+    # Sheet rows the store doesn't know were written before the store existed and
+    # only carry a filename. strict=True so a failed sheet read stops the run
+    # instead of silently re-analyzing (and re-emailing) those resumes.
+    done_ids = results_store.existing_file_ids(store)
+    legacy_names = get_existing_filenames(spreadsheet_id, sheet_name, strict=True) - results_store.existing_filenames(store)
+    legacy_names |= results_store.filenames_without_id(store)
+    return [f for f in files if f["id"] not in done_ids and f["name"] not in legacy_names]
+
+def process_resume_batch(files, store, notify_email=NOTIFY_EMAIL, retry_missing=True):
+    # files: [{"id", "name"}, ...]; up to GEMINI_BATCH_SIZE share one Gemini request.
+    # Returns {file_id: True/False}. With retry_missing=False, resumes missing from
+    # the batch reply map to None and get "file_uri" set, for the caller to requeue
+    # as single-resume turns.
+    for f in files:
+        print(f"\n📄 Processing {f['name']}...")
+    results, missing = analyze_resume_files(files)
 
+    outcome = {}
+    stored = []
     for f in files:
-        file_id = f["id"]
         file_name = f["name"]
+        if f["id"] in missing:
+            if not retry_missing:
+                print(f"⚠️ {file_name} missing from batch reply, requeued to analyze it alone.")
+                f["file_uri"] = missing[f["id"]]
+                outcome[f["id"]] = None
+                continue
+            print(f"⚠️ {file_name} missing from batch reply, analyzing it alone.")
+            results[f["id"]] = analyze_resume_file(f["id"], file_name, file_uri=missing[f["id"]])
 
-        if file_name in existing:
-            print(f"⏭️ Skipping already processed resume: {file_name}")
-            continue
-
-        print(f"\n📄 Processing {file_name}...")
-        parsed = analyze_resume_file(file_id, file_name)
+        parsed = results.get(f["id"])
         if not parsed:
             print(f"⚠️ Skipping {file_name} due to analysis failure.")
+            outcome[f["id"]] = False
             continue
 
+        results_store.append_record(store, results_store.to_record(file_name, parsed, store["pipeline"], f["id"]))
+        stored.append((f, parsed))
+
+    # Persist before any email goes out: if the process dies after this point the
+    # next run sees these resumes as processed instead of re-analyzing/re-emailing
+    results_store.flush(store)
+
+    for f, parsed in stored:
+        file_name = f["name"]
         row = build_row(file_name, parsed)
-        append_row_to_sheet(row)
 
         # send email summary
         email_body = (
@@ -417,10 +756,31 @@ def process_resumes_from_drive():
             f"Name: {row[1]}\nDomain: {row[2]}\nEmail: {row[3]}\nATS Score: {row[9]}\n\n"
             f"Skills: {row[4]}\nEducation: {row[5]}\nProjects: {row[6]}\nExperience: {row[8]}\n\nSummary:\n{row[7]}"
         )
-        send_email("your_mail", subject=f"AI Resume Summary - {file_name}", body=email_body)
+        send_email(notify_email, subject=f"AI Resume Summary - {file_name}", body=email_body)
+        outcome[f["id"]] = True
+    return outcome
 
-    # After all append, sort sheet by ATS Score
-    sort_sheet_by_ats()
+def process_resumes_from_drive(folder_id=FOLDER_ID, spreadsheet_id=SPREADSHEET_ID, sheet_name=SHEET_NAME, notify_email=NOTIFY_EMAIL):
+    # ensure headers
+    ensure_headers(spreadsheet_id, sheet_name)
+    store = results_store.open_store("default")
+
+    files = list_folder_pdfs(folder_id)
+    if not files:
+        print("⚠️ No PDF resumes found in Google Drive folder.")
+        return
+
+    pending = get_pending_files(files, store, spreadsheet_id, sheet_name)
+    print(f"📋 {len(files) - len(pending)} resumes already processed. Skipping duplicates.")
+
+    start_sheet_mirror(store, spreadsheet_id, sheet_name)
+    try:
+        batch_size = max(GEMINI_BATCH_SIZE, 1)
+        for i in range(0, len(pending), batch_size):
+            process_resume_batch(pending[i:i + batch_size], store, notify_email)
+    finally:
+        # Final flush + diff sync (the sync also sorts the sheet by ATS Score)
+        stop_sheet_mirror(store)
     print("\n✅ All resumes processed and sheet updated.")
 
 # ---------------------------
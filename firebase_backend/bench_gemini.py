@@ -0,0 +1,95 @@
+import time
+import argparse
+
+import automation
+
+# ---------------------------
+# Compare Gemini request modes on the same resumes
+# ---------------------------
+# Every mode analyzes the same uploaded files, so Drive download and Gemini
+# upload are paid once and excluded from the numbers. Each mode runs the
+# production path (analyze_resume_files + single-resume retry of anything
+# missing from a batch reply, as process_resume_batch does), and every
+# request attempt counts, retries and fallbacks included. Token counts come
+# from the usageMetadata Gemini returns with each response.
+
+def is_analyzed(result):
+    # One success rule for every mode: a normalized result with a real ATS score
+    return bool(result) and isinstance(result.get("ats_score"), int)
+
+def run_mode(label, files, batch_size, use_cache):
+    automation.GEMINI_CONTEXT_CACHE = use_cache
+    # Each cached mode creates (and pays for) its own cache
+    automation.invalidate_cached_prompt(retry_after=0)
+    automation.reset_gemini_usage()
+    parsed_ok = 0
+    t0 = time.monotonic()
+
+    for i in range(0, len(files), batch_size):
+        chunk = files[i:i + batch_size]
+        results, missing = automation.analyze_resume_files(chunk)
+        for f in chunk:
+            if f["id"] in missing:
+                results[f["id"]] = automation.analyze_resume_file(f["id"], f["name"], file_uri=missing[f["id"]])
+            parsed_ok += 1 if is_analyzed(results[f["id"]]) else 0
+
+    usage = dict(automation.GEMINI_USAGE)
+    usage["label"] = label
+    usage["seconds"] = time.monotonic() - t0
+    usage["parsed_ok"] = parsed_ok
+    return usage
+
+def print_report(rows, n):
+    print(f"\n📊 Gemini modes over {n} resumes")
+    print(f"{'Mode':<26}{'Requests':>9}{'Cache calls':>12}{'Input/resume':>14}{'Cached/resume':>15}{'Uncached/resume':>17}{'Output/resume':>15}{'Parsed':>8}{'Seconds':>9}")
+    for r in rows:
+        prompt = r["prompt_tokens"] / n
+        cached = r["cached_tokens"] / n
+        print(
+            f"{r['label']:<26}{r['requests']:>9}{r['cache_requests']:>12}{prompt:>14.0f}{cached:>15.0f}{prompt - cached:>17.0f}"
+            f"{r['output_tokens'] / n:>15.0f}{r['parsed_ok']:>5}/{n:<2}{r['seconds']:>9.1f}"
+        )
+    base = rows[0]
+    for r in rows[1:]:
+        if base["prompt_tokens"] and base["requests"]:
+            uncached = r["prompt_tokens"] - r["cached_tokens"]
+            print(
+                f"{r['label']}: {100 * (1 - uncached / base['prompt_tokens']):.0f}% fewer uncached input tokens, "
+                f"{100 * (1 - r['requests'] / base['requests']):.0f}% fewer requests than {base['label']}"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-resume, cached-prompt and batched Gemini analysis.")
+    parser.add_argument("--folder", default=automation.FOLDER_ID, help="Drive folder with sample PDF resumes")
+    parser.add_argument("--sample", type=int, default=10, help="Number of resumes to analyze per mode")
+    parser.add_argument("--batch-size", type=int, default=max(automation.GEMINI_BATCH_SIZE, 5))
+    args = parser.parse_args()
+
+    files = automation.list_folder_pdfs(args.folder)[:args.sample]
+    if not files:
+        print("⚠️ No PDF resumes found in Google Drive folder.")
+        return
+
+    uploaded = []
+    for f in files:
+        uri = automation.download_and_upload(f["id"], f["name"])
+        if uri:
+            uploaded.append({"id": f["id"], "name": f["name"], "file_uri": uri})
+    n = len(uploaded)
+    if not n:
+        print("❌ No resumes could be uploaded to Gemini.")
+        return
+
+    rows = [
+        run_mode("per-resume (current)", uploaded, 1, use_cache=False),
+        run_mode("per-resume + cache", uploaded, 1, use_cache=True),
+        run_mode(f"batch x{args.batch_size}", uploaded, args.batch_size, use_cache=False),
+        run_mode(f"batch x{args.batch_size} + cache", uploaded, args.batch_size, use_cache=True),
+    ]
+    print_report(rows, n)
+
+# ---------------------------
+# Run
+# ---------------------------
+if __name__ == "__main__":
+    main()
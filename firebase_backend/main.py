@@ -5,6 +5,7 @@ from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseUpload
 from google.auth.transport.requests import Request
 import io, uuid, pickle, os
+from pipelines_config import load_pipelines
 
 # -----------------------------
 # 🔥 Firebase Initialization
@@ -18,7 +19,18 @@ db = firestore.client()
 # -----------------------------
 TOKEN_PATH = "token.pkl"  # from your working upload script
 SCOPES = ["https://www.googleapis.com/auth/drive.file"]
-FOLDER_ID = "your_folder"  # your working Drive folder
+FOLDER_ID = os.getenv("FOLDER_ID", "your_folder")  # default Drive folder
+
+def get_pipeline_folder(pipeline):
+    # Per-opening folders from the same pipelines.json the scheduler runs. Read per
+    # request, so a missing or broken config only fails uploads that name a pipeline.
+    try:
+        pipelines = {p["name"]: p for p in load_pipelines()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Pipeline config unavailable: {e}")
+    if pipeline not in pipelines:
+        raise HTTPException(status_code=404, detail=f"Unknown pipeline: {pipeline}")
+    return pipelines[pipeline]["folder_id"]
 
 def get_drive_service():
     creds = None
@@ -89,7 +101,9 @@ async def verify_token(authorization: str = Header(None)):
 # 📤 Upload Resume → Google Drive
 # -----------------------------
 @app.post("/upload/resume")
-async def upload_resume(file: UploadFile = File(...), user_id: str = Form(...)):
+async def upload_resume(file: UploadFile = File(...), user_id: str = Form(...), pipeline: str = Form(None)):
+    folder_id = get_pipeline_folder(pipeline) if pipeline else FOLDER_ID
+
     try:
         # ✅ Read uploaded file
         file_bytes = await file.read()
@@ -107,7 +121,7 @@ async def upload_resume(file: UploadFile = File(...), user_id: str = Form(...)):
 
         # ✅ Build file metadata
         filename = f"{user_id}_{uuid.uuid4().hex}_{file.filename}"
-        file_metadata = {"name": filename, "parents": [FOLDER_ID]}
+        file_metadata = {"name": filename, "parents": [folder_id]}
 
         # ✅ Prepare upload
         media = MediaIoBaseUpload(io.BytesIO(file_bytes), mimetype=mime_type)
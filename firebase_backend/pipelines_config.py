@@ -0,0 +1,56 @@
+import os
+import json
+
+# ---------------------------
+# Config: pipelines.json (one entry per opening: Drive folder -> Sheet tab)
+# ---------------------------
+# Shared by scheduler.py and the FastAPI upload server, so it must stay free of
+# Gemini / Sheets / pyarrow imports.
+PIPELINES_CONFIG = "pipelines.json"
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def pipelines_config_path(path=None):
+    # Read PIPELINES_CONFIG at call time (after .env is loaded); relative paths are
+    # taken from this directory, not from wherever the process was started
+    path = path or os.getenv("PIPELINES_CONFIG", PIPELINES_CONFIG)
+    return path if os.path.isabs(path) else os.path.join(BACKEND_DIR, path)
+
+# ---------------------------
+# Load + validate pipeline config
+# ---------------------------
+def load_pipelines(path=None):
+    path = pipelines_config_path(path)
+    with open(path, "r", encoding="utf-8") as fh:
+        config = json.load(fh)
+
+    entries = config.get("pipelines", []) if isinstance(config, dict) else config
+    pipelines = []
+    seen = set()
+    for entry in entries:
+        # sheet_name is required: tabs are matched by exact title, and pipelines may
+        # share a spreadsheet, so a guessed default could write to the wrong tab
+        missing = [k for k in ("name", "folder_id", "spreadsheet_id", "sheet_name") if not entry.get(k)]
+        if missing:
+            raise ValueError(f"Pipeline entry {entry!r} is missing: {', '.join(missing)}")
+        if entry["name"] in seen:
+            raise ValueError(f"Duplicate pipeline name: {entry['name']}")
+        seen.add(entry["name"])
+
+        weight = int(entry.get("weight", 1))
+        if weight < 1:
+            raise ValueError(f"Pipeline '{entry['name']}' weight must be >= 1, got {weight}")
+
+        pipelines.append({
+            "name": entry["name"],
+            "folder_id": entry["folder_id"],
+            "spreadsheet_id": entry["spreadsheet_id"],
+            "sheet_name": entry["sheet_name"],
+            # None -> scheduler falls back to automation.NOTIFY_EMAIL
+            "notify_email": entry.get("notify_email"),
+            "weight": weight,
+            "priority": int(entry.get("priority", 0)),
+        })
+
+    if not pipelines:
+        raise ValueError(f"No pipelines configured in {path}")
+    return pipelines
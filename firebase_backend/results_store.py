@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import uuid
+import threading
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# ---------------------------
+# Config: local results store (system of record; Sheets is only a mirror)
+# ---------------------------
+RESULTS_DIR = os.getenv("RESULTS_DIR", "results")
+# Buffered records are written as one append-only Parquet segment every N results.
+# The pipeline also flushes after every batch, before emailing, so this is only a cap
+FLUSH_EVERY = int(os.getenv("RESULTS_FLUSH_EVERY", "25"))
+# Once a pipeline has more segments than this, they are merged into one file
+COMPACT_AFTER = int(os.getenv("RESULTS_COMPACT_AFTER", "16"))
+
+# "extra": any other keys Gemini returned for the project, as a JSON object string
+PROJECT_TYPE = pa.struct([("title", pa.string()), ("description", pa.string()), ("extra", pa.string())])
+
+# Full normalized record from analyze_resume_file, plus bookkeeping columns
+SCHEMA = pa.schema([
+    ("filename", pa.string()),
+    ("file_id", pa.string()),  # Drive file id: names can repeat, ids can't
+    ("pipeline", pa.string()),
+    ("name", pa.string()),
+    ("domain", pa.string()),
+    ("email", pa.string()),
+    ("skills", pa.list_(pa.string())),
+    ("education", pa.string()),
+    ("projects", pa.list_(PROJECT_TYPE)),
+    ("summary", pa.string()),
+    ("experience", pa.string()),
+    ("ats_score", pa.int32()),
+    ("analyzed_at", pa.timestamp("ms", tz="UTC")),
+])
+
+# ---------------------------
+# Open (or create) the store for one pipeline
+# ---------------------------
+def open_store(pipeline="default", base_dir=RESULTS_DIR):
+    path = os.path.join(base_dir, pipeline)
+    os.makedirs(path, exist_ok=True)
+    return {
+        "pipeline": pipeline,
+        "dir": path,
+        "buffer": [],
+        "lock": threading.RLock(),
+        "cache": None,  # (segment file names, table) of the last full read
+    }
+
+def list_segments(store):
+    # Dot-prefixed files are in-flight temp writes
+    names = [n for n in os.listdir(store["dir"]) if n.endswith(".parquet") and not n.startswith(".")]
+    return sorted(os.path.join(store["dir"], n) for n in names)
+
+# ---------------------------
+# Normalized result dict -> store record
+# ---------------------------
+def _text(value):
+    if value is None:
+        return "N/A"
+    # Lists/dicts/numbers are kept as JSON (not Python repr) so they can be parsed back
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+
+def _first_key(p, keys):
+    for k in keys:
+        if p.get(k):
+            return k
+    return None
+
+def to_record(file_name, parsed, pipeline="default", file_id=None):
+    projects = parsed.get("projects", [])
+    if isinstance(projects, str):
+        projects = [projects] if projects and projects != "N/A" else []
+    elif not isinstance(projects, list):
+        projects = []
+
+    project_rows = []
+    for p in projects:
+        if isinstance(p, dict):
+            title_key = _first_key(p, ("title", "name"))
+            desc_key = _first_key(p, ("description", "desc"))
+            extra = {k: v for k, v in p.items() if k not in (title_key, desc_key)}
+            project_rows.append({
+                "title": _text(p[title_key]) if title_key else "",
+                "description": _text(p[desc_key]) if desc_key else "",
+                "extra": json.dumps(extra, ensure_ascii=False, default=str) if extra else None,
+            })
+        else:
+            project_rows.append({"title": "", "description": _text(p), "extra": None})
+
+    ats = parsed.get("ats_score")
+    return {
+        "filename": file_name,
+        "file_id": file_id,
+        "pipeline": pipeline,
+        "name": _text(parsed.get("name", "N/A")),
+        "domain": _text(parsed.get("domain", "N/A")),
+        "email": _text(parsed.get("email", "N/A")),
+        "skills": [_text(s) for s in parsed.get("skills", []) or []],
+        "education": _text(parsed.get("education", "N/A")),
+        "projects": project_rows,
+        "summary": _text(parsed.get("summary", "N/A")),
+        "experience": _text(parsed.get("experience", "N/A")),
+        "ats_score": ats if isinstance(ats, int) else None,
+        "analyzed_at": datetime.now(timezone.utc),
+    }
+
+def to_result(record):
+    # Store record -> the dict shape build_row / email summaries expect
+    result = dict(record)
+    if result.get("ats_score") is None:
+        result["ats_score"] = "N/A"
+    return result
+
+# ---------------------------
+# Append-only writes
+# ---------------------------
+def append_record(store, record):
+    with store["lock"]:
+        store["buffer"].append(record)
+        if len(store["buffer"]) >= FLUSH_EVERY:
+            flush(store)
+
+def flush(store):
+    with store["lock"]:
+        if not store["buffer"]:
+            return None
+        table = pa.Table.from_pylist(store["buffer"], schema=SCHEMA)
+        name = f"seg-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(store["dir"], name)
+        tmp = os.path.join(store["dir"], f".{name}.tmp")
+        # Write then rename, so readers never see a half-written segment
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+        store["buffer"] = []
+        store["cache"] = None
+
+        if len(list_segments(store)) > COMPACT_AFTER:
+            compact(store)
+        return path
+
+def compact(store):
+    with store["lock"]:
+        segments = list_segments(store)
+        if len(segments) < 2:
+            return None
+        table = ds.dataset(segments, schema=SCHEMA, format="parquet").to_table()
+
+        # Keep only the latest record per Drive file (re-analysis replaces old result).
+        # Records without a file_id fall back to their filename as the key.
+        keys = pc.coalesce(table["file_id"], table["filename"])
+        table = table.append_column("_key", keys)
+        table = table.sort_by([("_key", "ascending"), ("analyzed_at", "descending")])
+        keys = table["_key"].to_pylist()
+        keep = [i for i, k in enumerate(keys) if i == 0 or k != keys[i - 1]]
+        table = table.take(keep).drop_columns(["_key"])
+
+        name = f"compact-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(store["dir"], name)
+        tmp = os.path.join(store["dir"], f".{name}.tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+        for seg in segments:
+            os.remove(seg)
+        store["cache"] = None
+        print(f"🗜️ [{store['pipeline']}] Compacted {len(segments)} segments into {name} ({table.num_rows} rows).")
+        return path
+
+# ---------------------------
+# Reads (served from memory once loaded; reloaded only when segments change)
+# ---------------------------
+def read_table(store):
+    with store["lock"]:
+        segments = tuple(list_segments(store))
+        cache = store["cache"]
+        if cache is None or cache[0] != segments:
+            if segments:
+                table = ds.dataset(list(segments), schema=SCHEMA, format="parquet").to_table()
+            else:
+                table = SCHEMA.empty_table()
+            store["cache"] = cache = (segments, table)
+        table = cache[1]
+        if store["buffer"]:
+            table = pa.concat_tables([table, pa.Table.from_pylist(store["buffer"], schema=SCHEMA)])
+        return table
+
+def existing_filenames(store):
+    return set(read_table(store)["filename"].to_pylist())
+
+def existing_file_ids(store):
+    ids = read_table(store)["file_id"]
+    return set(pc.drop_null(ids).to_pylist())
+
+def filenames_without_id(store):
+    # Records written before the file_id column existed can only be matched by name
+    table = read_table(store)
+    return set(table.filter(pc.is_null(table["file_id"]))["filename"].to_pylist())
+
+# ---------------------------
+# Analytics
+# ---------------------------
+def _rows_with_skill(table, skill):
+    skills = table["skills"]
+    flat = pc.utf8_lower(pc.list_flatten(skills))
+    parents = pc.list_parent_indices(skills)
+    rows = pc.unique(pc.filter(parents, pc.equal(flat, skill.lower())))
+    return table.take(rows)
+
+def top_candidates(store, n=10, domain=None, skill=None, min_score=None):
+    table = read_table(store)
+    if domain:
+        table = table.filter(pc.equal(pc.utf8_lower(table["domain"]), domain.lower()))
+    if skill:
+        table = _rows_with_skill(table, skill)
+    if min_score is not None:
+        table = table.filter(pc.greater_equal(table["ats_score"], min_score))
+    # Nulls ("N/A" scores) sort last
+    idx = pc.sort_indices(table, sort_keys=[("ats_score", "descending")])
+    return table.take(idx[:n]).to_pylist()
+
+def skill_counts(store, top=20):
+    flat = pc.list_flatten(read_table(store)["skills"])
+    counts = pc.value_counts(flat).to_pylist()
+    counts.sort(key=lambda c: c["counts"], reverse=True)
+    return [(c["values"], c["counts"]) for c in counts[:top]]
+
+def domain_summary(store):
+    table = read_table(store)
+    grouped = table.group_by("domain").aggregate([("filename", "count"), ("ats_score", "mean")])
+    rows = grouped.to_pylist()
+    rows.sort(key=lambda r: r["filename_count"], reverse=True)
+    return [{"domain": r["domain"], "candidates": r["filename_count"], "avg_ats": r["ats_score_mean"]} for r in rows]
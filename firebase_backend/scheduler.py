@@ -0,0 +1,168 @@
+import os
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+import automation
+import results_store
+from pipelines_config import load_pipelines
+
+# ---------------------------
+# Load environment variables
+# ---------------------------
+load_dotenv()
+
+# Shared Gemini budget: analysis requests per minute across ALL pipelines
+# (one request carries up to GEMINI_BATCH_SIZE resumes of the same pipeline;
+# retries and single-resume fallbacks are paced too)
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "10"))
+
+# "weighted" -> smooth weighted round-robin over every pipeline with pending resumes
+# "priority" -> highest priority pipelines first, weighted round-robin among equals
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "weighted")
+SCHEDULER_MODES = ("weighted", "priority")
+
+# ---------------------------
+# Pick the next pipeline to get a Gemini turn
+# ---------------------------
+def pick_next(pipelines, mode=SCHEDULER_MODE):
+    # Only pipelines with queued resumes compete, so an idle opening never holds quota
+    active = [p for p in pipelines if p["queue"] or p["retry"]]
+    if not active:
+        return None
+
+    if mode == "priority":
+        top = max(p["priority"] for p in active)
+        active = [p for p in active if p["priority"] == top]
+
+    # Smooth weighted round-robin: interleaves turns instead of bursting one pipeline
+    total = 0
+    for p in active:
+        p["current"] += p["weight"]
+        total += p["weight"]
+    chosen = max(active, key=lambda p: p["current"])
+    chosen["current"] -= total
+    return chosen
+
+# ---------------------------
+# Pace Gemini calls to the shared per-minute budget
+# ---------------------------
+def wait_for_quota(quota):
+    now = time.monotonic()
+    if now < quota["next_at"]:
+        time.sleep(quota["next_at"] - now)
+        now = time.monotonic()
+    quota["next_at"] = now + quota["interval"]
+
+# ---------------------------
+# Queue pending resumes for one pipeline
+# ---------------------------
+def prepare_pipeline(p):
+    automation.ensure_headers(p["spreadsheet_id"], p["sheet_name"])
+    p["store"] = results_store.open_store(p["name"])
+    files = automation.list_folder_pdfs(p["folder_id"])
+    pending = automation.get_pending_files(files, p["store"], p["spreadsheet_id"], p["sheet_name"])
+    p["queue"] = deque(pending)
+    p["retry"] = deque()  # left out of a batch reply; analyzed alone on a later turn
+    p["current"] = 0
+    p["stats"] = {
+        "queued": len(pending),
+        "skipped": len(files) - len(pending),
+        "processed": 0,
+        "failed": 0,
+        "busy_seconds": 0.0,
+        "finished_at": None,
+    }
+    print(f"📋 [{p['name']}] {len(pending)} pending, {p['stats']['skipped']} already processed.")
+    automation.start_sheet_mirror(p["store"], p["spreadsheet_id"], p["sheet_name"])
+
+# ---------------------------
+# Per-pipeline throughput report
+# ---------------------------
+def print_stats(pipelines, started_at):
+    elapsed = max(time.monotonic() - started_at, 1e-9)
+    print("\n📊 Pipeline throughput")
+    print(f"{'Pipeline':<24}{'Weight':>7}{'Prio':>6}{'Queued':>8}{'Done':>6}{'Failed':>8}{'Skipped':>9}{'Left':>6}{'Per min':>9}{'Avg s':>8}")
+    for p in pipelines:
+        st = p["stats"]
+        handled = st["processed"] + st["failed"]
+        # Throughput over the pipeline's own lifetime in this run (until its queue drained)
+        span = (st["finished_at"] or time.monotonic()) - started_at
+        per_min = st["processed"] / max(span, 1e-9) * 60 if st["processed"] else 0.0
+        avg = st["busy_seconds"] / handled if handled else 0.0
+        print(
+            f"{p['name'][:23]:<24}{p['weight']:>7}{p['priority']:>6}{st['queued']:>8}{st['processed']:>6}"
+            f"{st['failed']:>8}{st['skipped']:>9}{len(p['queue']) + len(p['retry']):>6}{per_min:>9.2f}{avg:>8.1f}"
+        )
+    total = sum(p["stats"]["processed"] for p in pipelines)
+    print(f"Total: {total} resumes in {elapsed:.1f}s ({total / elapsed * 60:.2f}/min)")
+
+# ---------------------------
+# Main process: many folder -> sheet pipelines, one shared Gemini budget
+# ---------------------------
+def run_pipelines(path=None, mode=SCHEDULER_MODE, rpm=GEMINI_RPM):
+    if mode not in SCHEDULER_MODES:
+        raise ValueError(f"Unknown scheduler mode '{mode}', expected one of {SCHEDULER_MODES}")
+
+    # pipelines.json (PIPELINES_CONFIG) describes every opening served by this process
+    pipelines = load_pipelines(path)
+    for p in pipelines:
+        p["notify_email"] = p["notify_email"] or automation.NOTIFY_EMAIL
+    for p in pipelines:
+        try:
+            prepare_pipeline(p)
+        except Exception as e:
+            print(f"❌ [{p['name']}] Could not prepare pipeline, skipping it:", e)
+            p["queue"] = deque()
+            p["retry"] = deque()
+            p["current"] = 0
+            p["stats"] = {"queued": 0, "skipped": 0, "processed": 0, "failed": 0, "busy_seconds": 0.0, "finished_at": None}
+
+    batch_size = max(automation.GEMINI_BATCH_SIZE, 1)
+    quota = {"interval": 60.0 / rpm if rpm > 0 else 0.0, "next_at": 0.0}
+    started_at = time.monotonic()
+    # Pace every generateContent request, not every turn: one turn may retry
+    automation.set_gemini_pacer(lambda: wait_for_quota(quota))
+
+    try:
+        while True:
+            p = pick_next(pipelines, mode)
+            if p is None:
+                break
+            if p["retry"]:
+                batch = [p["retry"].popleft()]
+            else:
+                batch = [p["queue"].popleft() for _ in range(min(batch_size, len(p["queue"])))]
+
+            t0 = time.monotonic()
+            try:
+                outcome = automation.process_resume_batch(batch, p["store"], p["notify_email"], retry_missing=False)
+            except Exception as e:
+                # One broken sheet/folder must not stall the other openings
+                print(f"❌ [{p['name']}] Failed on {', '.join(f['name'] for f in batch)}:", e)
+                outcome = {}
+            p["stats"]["busy_seconds"] += time.monotonic() - t0
+            for f in batch:
+                result = outcome.get(f["id"], False)
+                if result is None:
+                    p["retry"].append(f)
+                else:
+                    p["stats"]["processed" if result else "failed"] += 1
+            if not p["queue"] and not p["retry"]:
+                p["stats"]["finished_at"] = time.monotonic()
+    finally:
+        automation.set_gemini_pacer(None)
+        # Final flush + diff sync per pipeline (the sync also sorts each sheet by ATS Score)
+        for p in pipelines:
+            if "store" in p:
+                automation.stop_sheet_mirror(p["store"])
+
+    print_stats(pipelines, started_at)
+    print("\n✅ All pipelines processed.")
+    return pipelines
+
+# ---------------------------
+# Run
+# ---------------------------
+if __name__ == "__main__":
+    run_pipelines()